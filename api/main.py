@@ -1,7 +1,6 @@
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pathlib import Path
 import os
 import importlib
 
@@ -17,7 +16,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-DATA_DIR = Path(__file__).resolve().parents[1] / "data"
 API_KEY = os.getenv("API_KEY", "")
 
 
@@ -80,16 +78,17 @@ def versions():
 
 
 @app.get("/debug/periods_raw")
-def debug_periods_raw():
+def debug_periods_raw(league_id: str = None, season: str = None, refresh: bool = False):
     """
     ASCII-safe endpoint that avoids fantraxapi.scoring_periods() entirely.
     It *probes* which integer period numbers work by calling league.team_roster(...)
-    for period numbers 1..60 and returns those that succeed.
+    for period numbers 1..60 (concurrently) and returns those that succeed.
+    The result is cached per league/season; pass refresh=true to re-probe.
     """
     try:
         fx = importlib.import_module("src.fantrax_client")
-        league = fx.fetch_league_objects()
-        nums = fx.probe_valid_period_numbers(league, max_probe=60)
+        league = fx.fetch_league_objects(league_id)
+        nums = fx.scoring_period_numbers(league, league_id, season, refresh=refresh, max_probe=60)
         return JSONResponse(content={"ok": True, "count": len(nums), "numbers_sample": nums[:20]})
     except Exception as e:
         msg = _ascii(e)
@@ -97,7 +96,7 @@ def debug_periods_raw():
 
 
 @app.get("/debug/roster_try")
-def debug_roster_try(week: int = 1):
+def debug_roster_try(week: int = 1, league_id: str = None, season: str = None):
     """
     Probe-based roster test:
       1) Discover valid integer period numbers.
@@ -107,10 +106,10 @@ def debug_roster_try(week: int = 1):
     """
     try:
         fx = importlib.import_module("src.fantrax_client")
-        league = fx.fetch_league_objects()
+        league = fx.fetch_league_objects(league_id)
 
-        # 1) discover valid period numbers (ints)
-        valid = fx.probe_valid_period_numbers(league, max_probe=60)
+        # 1) discover valid period numbers (ints; cached after first discovery)
+        valid = fx.scoring_period_numbers(league, league_id, season, max_probe=60)
         if not valid:
             return {"ok": False, "message": "No valid period numbers discovered (cookie may be expired)."}
         if week < 1 or week > len(valid):
@@ -150,55 +149,247 @@ def debug_roster_try(week: int = 1):
 # Pipeline run + file serving
 # -----------------------------
 @app.get("/run")
-def run_pipeline(week: int = 1, request: Request = None):
+def run_pipeline(
+    week: int = 1,
+    league_id: str = None,
+    season: str = None,
+    competition: str = None,
+    request: Request = None,
+):
     require_api_key(request)
     try:
         pipeline = importlib.import_module("src.pipeline")
-        p = pipeline.run(week=week)
+        p = pipeline.run(week=week, league_id=league_id, season=season, competition=competition)
         return {"ok": True, "week": week, "artifact": p}
     except Exception as e:
         raise HTTPException(status_code=500, detail=_ascii(e))
 
 
-@app.get("/analysis/weekly.csv")
-def weekly_csv(week: int = 1):
-    f = DATA_DIR / f"cheekyfc_player_analysis_week{week}.csv"
-    if not f.exists():
+@app.api_route("/backfill", methods=["GET", "POST"])
+def run_backfill(
+    weeks: str,
+    league_id: str = None,
+    season: str = None,
+    competition: str = None,
+    request: Request = None,
+):
+    """
+    Start a backfill job over e.g. weeks=1-38 (or 1,2,5-7). Returns a job id;
+    poll /jobs/{id} for status and per-week timings.
+    """
+    require_api_key(request)
+    try:
+        bf = importlib.import_module("src.backfill")
+        pipeline = importlib.import_module("src.pipeline")
+        jobs = importlib.import_module("src.jobs")
+        week_list = bf.parse_weeks(weeks)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=_ascii(e))
+    job = jobs.submit(
+        "backfill",
+        pipeline.backfill,
+        weeks=week_list,
+        league_id=league_id,
+        season=season,
+        competition=competition,
+    )
+    return {"ok": True, "job": job}
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str, request: Request):
+    require_api_key(request)
+    jobs = importlib.import_module("src.jobs")
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return {"ok": True, "job": job}
+
+
+# Media types a client may ask for via Accept -> artifact format. Only the Arrow
+# IPC *stream* format is produced; a request for the Arrow file format gets 406.
+_ACCEPT_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/vnd.apache.parquet": "parquet",
+    "application/octet-stream": "parquet",
+}
+
+
+def _parse_qlist(header: str):
+    """'a/b;q=0.5, c/d' -> [('c/d', 1.0), ('a/b', 0.5)], highest q first."""
+    out = []
+    for part in (header or "").split(","):
+        bits = [b.strip() for b in part.split(";")]
+        if not bits[0]:
+            continue
+        q = 1.0
+        for b in bits[1:]:
+            if b.startswith("q="):
+                try:
+                    q = float(b[2:])
+                except ValueError:
+                    q = 0.0
+        out.append((bits[0].lower(), q))
+    return sorted(out, key=lambda x: x[1], reverse=True)
+
+
+def _negotiate_format(request: Request, default: str = "csv"):
+    for media, q in _parse_qlist(request.headers.get("accept", "")):
+        if q <= 0:
+            continue
+        if media in _ACCEPT_FORMATS:
+            return _ACCEPT_FORMATS[media]
+        if media in ("*/*", "text/*"):
+            return default
+        if media == "application/*":
+            return "parquet"  # served as written, no encoding
+    if request.headers.get("accept"):
+        return None
+    return default
+
+
+def _accepts_gzip(request: Request):
+    return any(
+        enc in ("gzip", "*") and q > 0
+        for enc, q in _parse_qlist(request.headers.get("accept-encoding", ""))
+    )
+
+
+def _tenant_dir(league_id: str = None, season: str = None):
+    tenancy = importlib.import_module("src.tenancy")
+    return tenancy.tenant_dir(tenancy.resolve(league_id=league_id, season=season))
+
+
+def _serve_weekly(week: int, fmt: str, request: Request, league_id: str = None, season: str = None):
+    artifacts = importlib.import_module("src.artifacts")
+    source = _tenant_dir(league_id, season) / f"cheekyfc_player_analysis_week{week}.parquet"
+    if not source.exists():
         raise HTTPException(
             status_code=404,
-            detail=f"Not found: {f.name}. Hit /run?week={week} first.",
+            detail=f"Not found: {source.name}. Hit /run?week={week} first.",
         )
-    return FileResponse(str(f), media_type="text/csv", filename=f.name)
+    ext, media_type = artifacts.FORMATS[fmt]
+    filename = f"{source.stem}.{ext}"
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if fmt == "parquet":
+        # already compressed; served as written by the pipeline
+        return FileResponse(str(source), media_type=media_type, filename=filename, headers=headers)
+
+    gzip = _accepts_gzip(request)
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    cached = artifacts.lookup(source, fmt, gzip=gzip)
+    if cached is not None:
+        return FileResponse(str(cached), media_type=media_type, filename=filename, headers=headers)
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return StreamingResponse(
+        artifacts.stream(source, fmt, gzip=gzip), media_type=media_type, headers=headers
+    )
 
 
-@app.get("/analysis/weekly.parquet")
-def weekly_parquet(week: int = 1):
-    f = DATA_DIR / f"cheekyfc_player_analysis_week{week}.parquet"
-    if not f.exists():
+@app.get("/analysis/weekly")
+def weekly(request: Request, week: int = 1, league_id: str = None, season: str = None):
+    fmt = _negotiate_format(request)
+    if fmt is None:
         raise HTTPException(
-            status_code=404,
-            detail=f"Not found: {f.name}. Hit /run?week={week} first.",
+            status_code=406,
+            detail="Supported: " + ", ".join(sorted(_ACCEPT_FORMATS)),
         )
-    return FileResponse(
-        str(f), media_type="application/octet-stream", filename=f.name
-    )
+    return _serve_weekly(week, fmt, request, league_id, season)
+
+
+@app.get("/analysis/weekly.csv")
+def weekly_csv(request: Request, week: int = 1, league_id: str = None, season: str = None):
+    return _serve_weekly(week, "csv", request, league_id, season)
+
+
+@app.get("/analysis/weekly.jsonl")
+def weekly_jsonl(request: Request, week: int = 1, league_id: str = None, season: str = None):
+    return _serve_weekly(week, "jsonl", request, league_id, season)
+
+
+@app.get("/analysis/weekly.arrow")
+def weekly_arrow(request: Request, week: int = 1, league_id: str = None, season: str = None):
+    return _serve_weekly(week, "arrow", request, league_id, season)
+
+
+@app.get("/analysis/weekly.parquet")
+def weekly_parquet(request: Request, week: int = 1, league_id: str = None, season: str = None):
+    return _serve_weekly(week, "parquet", request, league_id, season)
+
+@app.get("/analysis/changes")
+def analysis_changes(
+    request: Request, since: int, week: int = None, league_id: str = None, season: str = None
+):
+    """
+    Roster/projection changes between week `since` and `week` (default: latest run).
+    Send the returned ETag back as If-None-Match to get a 304 when nothing changed.
+    """
+    try:
+        changes = importlib.import_module("src.changes")
+        data_dir = _tenant_dir(league_id, season)
+        week = week or changes.latest_week(data_dir)
+        if week is None:
+            raise HTTPException(status_code=404, detail="No runs yet. Hit /run?week=N first.")
+        if since >= week:
+            return {"ok": True, "since": since, "week": week, "teams": {}, "moves": [], "projection_swings": []}
+        tag = changes.etag(data_dir, since, week)
+        sent = request.headers.get("if-none-match", "")
+        sent_tags = {t.strip().removeprefix("W/").strip('"') for t in sent.split(",")}
+        headers = {"ETag": f'"{tag}"', "Cache-Control": "no-cache"}
+        if tag in sent_tags or "*" in sent_tags:
+            return Response(status_code=304, headers=headers)
+        cs = changes.change_set(data_dir, since, week)
+        return JSONResponse(content={"ok": True, **cs}, headers=headers)
+    except HTTPException:
+        raise
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=_ascii(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=_ascii(e))
 
 @app.api_route("/stats/refresh", methods=["GET", "POST"])
-def stats_refresh(request: Request):
+def stats_refresh(request: Request, competition: str = None, season: str = None):
     require_api_key(request)
     try:
         svc = importlib.import_module("src.stats_service")
-        res = svc.refresh(force=True)
+        res = svc.refresh(force=True, competition=competition, season=season)
         return res
     except Exception as e:
         raise HTTPException(status_code=500, detail=_ascii(e))
 
 
+@app.api_route("/stats/match_logs/refresh", methods=["GET", "POST"])
+def match_logs_refresh(request: Request, competition: str = None, season: str = None, max_matches: int = None):
+    """
+    Ingest per-match player stats (only matches not stored yet) as a background
+    job; poll /jobs/{id}. The first run for a season scrapes every played match.
+    """
+    require_api_key(request)
+    ml = importlib.import_module("src.match_logs")
+    jobs = importlib.import_module("src.jobs")
+    job = jobs.submit("match_logs", ml.update, competition=competition, season=season, max_matches=max_matches)
+    return {"ok": True, "job": job}
+
+
 @app.get("/players/search")
-def players_search(q: str = "", team: str = "", position: str = "", limit: int = 50):
+def players_search(
+    q: str = "",
+    team: str = "",
+    position: str = "",
+    limit: int = 50,
+    competition: str = None,
+    season: str = None,
+    sort: str = "",
+):
     try:
         svc = importlib.import_module("src.stats_service")
-        df = svc.search_players(q=q, team=team, position=position, limit=limit)
+        df = svc.search_players(
+            q=q, team=team, position=position, limit=limit, competition=competition, season=season, sort=sort
+        )
         # return a compact JSON
         return {
             "ok": True,
@@ -209,7 +400,7 @@ def players_search(q: str = "", team: str = "", position: str = "", limit: int =
         raise HTTPException(status_code=500, detail=_ascii(e))
 
 @app.get("/players/compare")
-def players_compare(name: str):
+def players_compare(name: str, competition: str = None, season: str = None):
     """
     name: comma-separated list of player names
     """
@@ -218,7 +409,7 @@ def players_compare(name: str):
         if not names:
             raise HTTPException(status_code=400, detail="Provide ?name=Player A,Player B")
         svc = importlib.import_module("src.stats_service")
-        df = svc.compare_players(names)
+        df = svc.compare_players(names, competition=competition, season=season)
         return {"ok": True, "count": int(len(df)), "players": df.to_dict(orient="records")}
     except HTTPException:
         raise
@@ -226,30 +417,40 @@ def players_compare(name: str):
         raise HTTPException(status_code=500, detail=_ascii(e))
 
 @app.get("/matchups/table")
-def matchups_table():
+def matchups_table(competition: str = None, season: str = None):
     try:
         svc = importlib.import_module("src.stats_service")
-        df = svc.matchup_table()
+        df = svc.matchup_table(competition=competition, season=season)
         return {"ok": True, "count": int(len(df)), "table": df.to_dict(orient="records")}
     except Exception as e:
         raise HTTPException(status_code=500, detail=_ascii(e))
 
 @app.post("/stats/refresh")
-def stats_refresh(request: Request):
+def stats_refresh(request: Request, competition: str = None, season: str = None):
     # protect with API key since it triggers scraping
     require_api_key(request)
     try:
         svc = importlib.import_module("src.stats_service")
-        res = svc.refresh(force=True)
+        res = svc.refresh(force=True, competition=competition, season=season)
         return res
     except Exception as e:
         raise HTTPException(status_code=500, detail=_ascii(e))
 
 @app.get("/players/search")
-def players_search(q: str = "", team: str = "", position: str = "", limit: int = 50):
+def players_search(
+    q: str = "",
+    team: str = "",
+    position: str = "",
+    limit: int = 50,
+    competition: str = None,
+    season: str = None,
+    sort: str = "",
+):
     try:
         svc = importlib.import_module("src.stats_service")
-        df = svc.search_players(q=q, team=team, position=position, limit=limit)
+        df = svc.search_players(
+            q=q, team=team, position=position, limit=limit, competition=competition, season=season, sort=sort
+        )
         # return a compact JSON
         return {
             "ok": True,
@@ -260,7 +461,7 @@ def players_search(q: str = "", team: str = "", position: str = "", limit: int =
         raise HTTPException(status_code=500, detail=_ascii(e))
 
 @app.get("/players/compare")
-def players_compare(name: str):
+def players_compare(name: str, competition: str = None, season: str = None):
     """
     name: comma-separated list of player names
     """
@@ -269,7 +470,7 @@ def players_compare(name: str):
         if not names:
             raise HTTPException(status_code=400, detail="Provide ?name=Player A,Player B")
         svc = importlib.import_module("src.stats_service")
-        df = svc.compare_players(names)
+        df = svc.compare_players(names, competition=competition, season=season)
         return {"ok": True, "count": int(len(df)), "players": df.to_dict(orient="records")}
     except HTTPException:
         raise
@@ -277,10 +478,10 @@ def players_compare(name: str):
         raise HTTPException(status_code=500, detail=_ascii(e))
 
 @app.get("/matchups/table")
-def matchups_table():
+def matchups_table(competition: str = None, season: str = None):
     try:
         svc = importlib.import_module("src.stats_service")
-        df = svc.matchup_table()
+        df = svc.matchup_table(competition=competition, season=season)
         return {"ok": True, "count": int(len(df)), "table": df.to_dict(orient="records")}
     except Exception as e:
         raise HTTPException(status_code=500, detail=_ascii(e))
@@ -0,0 +1,168 @@
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+from io import BytesIO
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+# Parquet is the only format the pipeline writes; every other encoding is
+# produced on first request by streaming record batches and cached here.
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+ENCODED_DIR = DATA_DIR / "encoded"
+ENCODED_CACHE_MAX_BYTES = int(os.getenv("ENCODED_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+BATCH_ROWS = 4096
+
+# format -> (file extension, media type)
+FORMATS = {
+    "parquet": ("parquet", "application/octet-stream"),
+    "csv": ("csv", "text/csv"),
+    "jsonl": ("jsonl", "application/x-ndjson"),
+    "arrow": ("arrow", "application/vnd.apache.arrow.stream"),
+}
+
+_evict_lock = threading.Lock()
+# cache file name -> last time it was served; eviction is LRU on this, falling
+# back to mtime for files not touched since start-up. File mtimes are never
+# bumped so FileResponse's Last-Modified/ETag stay stable across hits.
+_last_used = {}
+
+
+# ---------- Encoders: ParquetFile -> iterator of bytes ----------
+
+def _drain(buf: BytesIO) -> bytes:
+    data = buf.getvalue()
+    buf.seek(0)
+    buf.truncate(0)
+    return data
+
+def _encode_csv(pf):
+    buf = BytesIO()
+    writer = pacsv.CSVWriter(buf, pf.schema_arrow)
+    for batch in pf.iter_batches(batch_size=BATCH_ROWS):
+        writer.write_batch(batch)
+        yield _drain(buf)
+    writer.close()
+    yield _drain(buf)
+
+def _encode_jsonl(pf):
+    for batch in pf.iter_batches(batch_size=BATCH_ROWS):
+        lines = [json.dumps(row, default=str) for row in batch.to_pylist()]
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+def _encode_arrow(pf):
+    buf = BytesIO()
+    with pa.ipc.new_stream(buf, pf.schema_arrow) as writer:
+        for batch in pf.iter_batches(batch_size=BATCH_ROWS):
+            writer.write_batch(batch)
+            yield _drain(buf)
+    yield _drain(buf)
+
+_ENCODERS = {
+    "csv": _encode_csv,
+    "jsonl": _encode_jsonl,
+    "arrow": _encode_arrow,
+}
+
+def _gzip(chunks):
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+# ---------- Cache ----------
+
+def _cache_stem(source: Path) -> str:
+    # tenants/<league>/<season>/x.parquet -> tenants__<league>__<season>__x
+    try:
+        parts = source.resolve().relative_to(DATA_DIR.resolve()).with_suffix("").parts
+    except ValueError:
+        parts = (source.stem,)
+    return "__".join(parts)
+
+def _source_stamp(source: Path) -> str:
+    st = source.stat()
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+def cached_path(source: Path, fmt: str, gzip: bool = False, stamp: str = None) -> Path:
+    # the source's mtime/size stamp is part of the name, so an encoding of an
+    # older version of the Parquet can never be served for a newer one
+    ext = FORMATS[fmt][0] + (".gz" if gzip else "")
+    stamp = stamp or _source_stamp(source)
+    return ENCODED_DIR / f"{_cache_stem(source)}.{stamp}.{ext}"
+
+def lookup(source: Path, fmt: str, gzip: bool = False):
+    """Return the cached encoding of the current `source`, else None."""
+    try:
+        p = cached_path(source, fmt, gzip)
+        if not p.exists():
+            return None
+    except FileNotFoundError:
+        return None
+    _last_used[p.name] = time.time()
+    return p
+
+def invalidate(source: Path):
+    """Drop every cached encoding of `source` (called when it is rewritten)."""
+    if not ENCODED_DIR.exists():
+        return
+    for p in ENCODED_DIR.glob(f"{_cache_stem(source)}.*"):
+        p.unlink(missing_ok=True)
+
+def _evict(max_bytes: int = ENCODED_CACHE_MAX_BYTES):
+    with _evict_lock:
+        files = []
+        for p in ENCODED_DIR.iterdir():
+            if p.name.startswith("."):
+                continue  # in-flight .part files
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            files.append((max(st.st_mtime, _last_used.get(p.name, 0.0)), st.st_size, p))
+        total = sum(size for _, size, _ in files)
+        for _, size, p in sorted(files):
+            if total <= max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            _last_used.pop(p.name, None)
+            total -= size
+
+def stream(source: Path, fmt: str, gzip: bool = False):
+    """
+    Yield `source` encoded as `fmt` chunk by chunk. The bytes are teed into a
+    temp file that is promoted into the cache only once the stream completes,
+    so a dropped client never leaves a truncated entry behind.
+    """
+    if fmt not in _ENCODERS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    ENCODED_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = _source_stamp(source)
+    final = cached_path(source, fmt, gzip, stamp)
+    tmp = final.with_name(f".{final.name}.{uuid.uuid4().hex}.part")
+    done = False
+    try:
+        with pq.ParquetFile(source) as pf, open(tmp, "wb") as fh:
+            chunks = _ENCODERS[fmt](pf)
+            if gzip:
+                chunks = _gzip(chunks)
+            for chunk in chunks:
+                fh.write(chunk)
+                yield chunk
+        # source rewritten mid-stream: the client got the old version, don't cache it
+        if source.exists() and _source_stamp(source) == stamp:
+            os.replace(tmp, final)
+            done = True
+    finally:
+        if not done:
+            tmp.unlink(missing_ok=True)
+    _evict()
@@ -0,0 +1,47 @@
+"""
+Rebuild many weeks in one process:
+
+    python -m src.backfill --weeks 1-38 [--league-id ID] [--season 2025-2026] [--competition "Premier League"]
+"""
+import argparse
+import json
+from .pipeline import BACKFILL_WORKERS, backfill
+
+def parse_weeks(spec: str):
+    """'1-5,8,10-12' -> [1, 2, 3, 4, 5, 8, 10, 11, 12]"""
+    weeks = set()
+    for part in str(spec).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = (int(x) for x in part.split("-", 1))
+            if lo > hi:
+                raise ValueError(f"Bad week range: {part}")
+            weeks.update(range(lo, hi + 1))
+        else:
+            weeks.add(int(part))
+    if not weeks:
+        raise ValueError("No weeks given")
+    return sorted(weeks)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run the Cheeky FC pipeline over a range of weeks.")
+    ap.add_argument("--weeks", required=True, help="e.g. 1-38 or 1,2,5-7")
+    ap.add_argument("--league-id")
+    ap.add_argument("--season")
+    ap.add_argument("--competition")
+    ap.add_argument("--workers", type=int, default=BACKFILL_WORKERS)
+    args = ap.parse_args(argv)
+
+    report = backfill(
+        parse_weeks(args.weeks),
+        league_id=args.league_id,
+        season=args.season,
+        competition=args.competition,
+        workers=args.workers,
+    )
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Projection swings smaller than this (in points) are not reported
+PROJ_DELTA_THRESHOLD = float(os.getenv("CHANGE_PROJ_THRESHOLD", "1.0"))
+
+KEY = ["team_id", "player_id"]
+TRACKED = ["team_name", "player_name", "position", "is_bench", "proj_points_simple"]
+
+def snapshot_path(data_dir: Path, week: int) -> Path:
+    return data_dir / f"cheekyfc_snapshot_week{week}.parquet"
+
+def changes_path(data_dir: Path, week: int) -> Path:
+    return data_dir / f"cheekyfc_changes_week{week}.json"
+
+def snapshot(merged: pd.DataFrame) -> pd.DataFrame:
+    """Compact per-row view of a weekly run plus a content hash per (team, player)."""
+    snap = merged[[c for c in KEY + TRACKED if c in merged.columns]].copy()
+    if "proj_points_simple" in snap:
+        snap["proj_points_simple"] = snap["proj_points_simple"].round(2)
+    snap["row_hash"] = pd.util.hash_pandas_object(snap, index=False).to_numpy(dtype="uint64")
+    return snap
+
+def digest(snap: pd.DataFrame) -> str:
+    """Order-independent hash of a snapshot."""
+    return hashlib.sha1(np.sort(snap["row_hash"].to_numpy(dtype="uint64")).tobytes()).hexdigest()[:16]
+
+def _records(df: pd.DataFrame, cols):
+    return json.loads(df[[c for c in cols if c in df.columns]].to_json(orient="records"))
+
+def diff(prev: pd.DataFrame, cur: pd.DataFrame, threshold: float = PROJ_DELTA_THRESHOLD) -> dict:
+    m = prev.merge(cur, on=KEY, how="outer", suffixes=("_prev", ""), indicator=True)
+    added = m[m["_merge"] == "right_only"]
+    dropped = m[m["_merge"] == "left_only"].copy()
+    for c in TRACKED:
+        if c in prev.columns:
+            dropped[c] = dropped[f"{c}_prev"]
+    changed = m[(m["_merge"] == "both") & (m["row_hash_prev"] != m["row_hash"])]
+
+    teams = {}
+    for kind, part in (("added", added), ("dropped", dropped)):
+        cols = ["player_id", "player_name", "position", "is_bench"]
+        for team_id, grp in part.groupby("team_id", sort=True):
+            entry = teams.setdefault(str(team_id), {"team_name": grp["team_name"].iloc[0], "added": [], "dropped": []})
+            entry[kind] = _records(grp, cols)
+
+    moved = pd.Series(False, index=changed.index)
+    for c in ("position", "is_bench"):
+        if c in cur.columns and c in prev.columns:
+            moved |= changed[c].astype(str) != changed[f"{c}_prev"].astype(str)
+    moves = changed[moved]
+
+    swings = changed.iloc[0:0]
+    if "proj_points_simple" in cur.columns and "proj_points_simple" in prev.columns:
+        delta = (changed["proj_points_simple"].fillna(0) - changed["proj_points_simple_prev"].fillna(0)).round(2)
+        swings = changed.assign(proj_delta=delta)[delta.abs() >= threshold]
+        swings = swings.reindex(swings["proj_delta"].abs().sort_values(ascending=False).index)
+
+    return {
+        "teams": teams,
+        "moves": _records(moves, KEY + ["player_name", "position_prev", "position", "is_bench_prev", "is_bench"]),
+        "projection_swings": _records(
+            swings, KEY + ["player_name", "proj_points_simple_prev", "proj_points_simple", "proj_delta"]
+        ),
+    }
+
+def _etag(since: int, week: int, prev_digest: str, cur_digest: str) -> str:
+    return hashlib.sha1(f"{since}:{week}:{prev_digest}:{cur_digest}".encode()).hexdigest()[:20]
+
+def _load(data_dir: Path, since: int, week: int):
+    cur = pd.read_parquet(snapshot_path(data_dir, week))
+    if since < 1:
+        prev = cur.iloc[0:0]
+    elif snapshot_path(data_dir, since).exists():
+        prev = pd.read_parquet(snapshot_path(data_dir, since))
+    else:
+        raise FileNotFoundError(f"No snapshot for week {since}. Hit /run?week={since} first.")
+    return prev, cur
+
+def latest_week(data_dir: Path):
+    weeks = [
+        int(m.group(1))
+        for p in data_dir.glob("cheekyfc_snapshot_week*.parquet")
+        if (m := re.search(r"week(\d+)\.parquet$", p.name))
+    ]
+    return max(weeks) if weeks else None
+
+def etag(data_dir: Path, since: int, week: int) -> str:
+    prev, cur = _load(data_dir, since, week)
+    return _etag(since, week, digest(prev), digest(cur))
+
+def change_set(data_dir: Path, since: int, week: int) -> dict:
+    """Changes between the `since` snapshot and the `week` snapshot (since=0: everything is new)."""
+    prev, cur = _load(data_dir, since, week)
+    tag = _etag(since, week, digest(prev), digest(cur))
+    stored = changes_path(data_dir, week)
+    if since == week - 1 and stored.exists():
+        cs = json.loads(stored.read_text())
+        if cs.get("etag") == tag:
+            return cs
+    return {"since": since, "week": week, "etag": tag, **diff(prev, cur)}
+
+def record(data_dir: Path, week: int, merged: pd.DataFrame) -> dict:
+    """Store this week's snapshot and its change set against the previous week."""
+    snapshot(merged).to_parquet(snapshot_path(data_dir, week), index=False)
+    since = week - 1 if snapshot_path(data_dir, week - 1).exists() else 0
+    cs = change_set(data_dir, since, week)
+    if since:
+        changes_path(data_dir, week).write_text(json.dumps(cs))
+    return cs
@@ -1,5 +1,9 @@
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from .tenancy import lock, resolve, tenant_dir
 
 # ---------- Cookie/session helpers ----------
 
@@ -53,28 +57,29 @@ def _get_league_class():
         return fantraxapi.objs.League
     raise ImportError("Could not locate League class in fantraxapi (tried top-level and fantraxapi.objs).")
 
-def fetch_league_objects():
+def fetch_league_objects(league_id: str = None):
     """Returns a League object with an authenticated session injected."""
     from .config import settings  # avoid import loop
+    league_id = league_id or settings.league_id
     League = _get_league_class()
     sess = _make_session()
 
     # Try constructor variants
     try:
         # many 1.x builds accept session=
-        league = League(settings.league_id, session=sess)
+        league = League(league_id, session=sess)
         return league
     except TypeError:
         pass
     try:
         # some builds accept client= (requests.Session)
-        league = League(settings.league_id, client=sess)
+        league = League(league_id, client=sess)
         return league
     except TypeError:
         pass
 
     # Fallback: construct then attach session attribute used internally
-    league = League(settings.league_id)
+    league = League(league_id)
     if hasattr(league, "session"):
         league.session = sess
         return league
@@ -157,10 +162,144 @@ def _league_team_roster_any(league, team, candidates, sp):
         except Exception as e:
             last_err = e
 
-    raise TypeError(f"league.team_roster failed for all variants; last error={last_err}")
+    raise TypeError(f"league.team_roster failed for all variants; last error={last_err}") from last_err
 
-def get_team_roster_slots(league, week: int):
-    candidates, sp = _resolve_week_index(league, week)
+# ---------- Scoring-period discovery (cached per league/season) ----------
+
+PERIODS_TTL_SECONDS = int(os.getenv("PERIODS_TTL_SECONDS", str(24 * 3600)))
+PROBE_WORKERS = int(os.getenv("PERIODS_PROBE_WORKERS", "8"))
+# Transient probe errors (timeouts, 429/5xx) are retried this many times with
+# exponential backoff; they never count as "period does not exist".
+PROBE_RETRIES = int(os.getenv("PERIODS_PROBE_RETRIES", "3"))
+PROBE_BACKOFF_SECONDS = float(os.getenv("PERIODS_PROBE_BACKOFF_SECONDS", "0.5"))
+# Out-of-range weeks re-probe at most once per this many seconds, so a backfill
+# of future weeks does not probe once per week. Explicit refreshes ignore it.
+PERIODS_REFRESH_GRACE_SECONDS = int(os.getenv("PERIODS_REFRESH_GRACE_SECONDS", "60"))
+
+_periods_mem = {}
+
+def _periods_path(league_id: str, season: str):
+    return tenant_dir(resolve(league_id=league_id, season=season)) / "scoring_periods.json"
+
+def _is_transient(err) -> bool:
+    """Network errors, timeouts, 429 and 5xx: worth retrying, never proof a period is invalid."""
+    while err is not None:
+        if isinstance(err, (requests.ConnectionError, requests.Timeout, TimeoutError, ConnectionError)):
+            return True
+        status = getattr(getattr(err, "response", None), "status_code", None)
+        if status is not None and (status == 429 or status >= 500):
+            return True
+        err = err.__cause__ or err.__context__
+    return False
+
+def _probe_period(league, team, n: int) -> bool:
+    """True if period n is accepted, False if it is rejected; raises if it stays unreachable."""
+    for attempt in range(PROBE_RETRIES + 1):
+        try:
+            _league_team_roster_any(league, team, [("number_int", n)], None)
+            return True
+        except Exception as e:
+            if not _is_transient(e):
+                return False
+            if attempt == PROBE_RETRIES:
+                raise RuntimeError(f"Probing scoring period {n} kept failing: {e}") from e
+            time.sleep(PROBE_BACKOFF_SECONDS * 2 ** attempt)
+
+def _holes(nums):
+    return sorted(set(range(nums[0], nums[-1] + 1)) - set(nums)) if nums else []
+
+def probe_valid_period_numbers(league, max_probe: int = 60, workers: int = PROBE_WORKERS):
+    """
+    Integer period numbers 1..max_probe that league.team_roster(...) accepts,
+    probed concurrently against the first team. Always hits the network; use
+    scoring_period_numbers() for the cached mapping.
+
+    A gap inside the accepted range would shift every later week onto the wrong
+    period, so gaps are probed again; any that remain must be confirmed by
+    league.scoring_periods() having exactly that many periods, else this raises.
+    """
+    team = next(iter(league.teams), None)
+    if team is None:
+        raise ValueError("League has no teams; cannot probe scoring periods.")
+    nums = range(1, max_probe + 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        ok = list(pool.map(lambda n: _probe_period(league, team, n), nums))
+    found = [n for n, good in zip(nums, ok) if good]
+
+    holes = _holes(found)
+    if holes:
+        found = sorted(found + [n for n in holes if _probe_period(league, team, n)])
+        holes = _holes(found)
+    if holes:
+        try:
+            expected = len(_list_periods(league))
+        except Exception:
+            expected = None
+        if expected != len(found):
+            raise RuntimeError(
+                f"Scoring period probe has gaps at {holes} "
+                f"({len(found)} found, league lists {expected}); not using it."
+            )
+    return found
+
+def scoring_period_numbers(league, league_id: str = None, season: str = None,
+                           refresh: bool = False, max_probe: int = 60, grace: float = 0):
+    """
+    Valid period numbers for (league_id, season), in week order. Discovered by
+    probing once, then served from memory / data/tenants/.../scoring_periods.json
+    until PERIODS_TTL_SECONDS elapse or refresh=True. A discovery (or failed
+    discovery) younger than `grace` seconds is reused even on refresh.
+    A failed discovery is never written to disk.
+    """
+    path = _periods_path(league_id, season)
+    key = str(path)
+    with lock("periods", key):
+        hit = _periods_mem.get(key)
+        if hit is None and path.exists():
+            hit = json.loads(path.read_text())
+        if hit is not None:
+            _periods_mem[key] = hit
+            age = time.time() - hit["discovered_at"]
+            if age < grace:
+                if hit.get("error"):
+                    raise RuntimeError(hit["error"])
+                return hit["numbers"]
+            if not refresh and hit["numbers"] and age < PERIODS_TTL_SECONDS:
+                return hit["numbers"]
+
+        try:
+            nums = probe_valid_period_numbers(league, max_probe=max_probe)
+        except Exception as e:
+            # remembered (in memory only) so callers passing `grace` don't re-probe
+            _periods_mem[key] = {"numbers": [], "error": str(e), "discovered_at": time.time()}
+            raise
+        hit = {"numbers": nums, "discovered_at": time.time()}
+        _periods_mem[key] = hit
+        if hit["numbers"]:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(hit))
+        return hit["numbers"]
+
+def resolve_period_number(league, week: int, league_id: str = None, season: str = None):
+    """
+    1-based week -> Fantrax period number. A week past the cached range triggers
+    one re-probe, unless the last discovery is younger than
+    PERIODS_REFRESH_GRACE_SECONDS.
+    """
+    grace = PERIODS_REFRESH_GRACE_SECONDS
+    nums = scoring_period_numbers(league, league_id, season, grace=grace)
+    if week > len(nums):
+        nums = scoring_period_numbers(league, league_id, season, refresh=True, grace=grace)
+    if week < 1 or week > len(nums):
+        raise ValueError(f"Week {week} out of range (1..{len(nums)})")
+    return nums[week - 1]
+
+def get_team_roster_slots(league, week: int, league_id: str = None, season: str = None):
+    try:
+        candidates, sp = [("number_int", resolve_period_number(league, week, league_id, season))], None
+    except Exception:
+        # discovery found nothing usable; fall back to league.scoring_periods()
+        candidates, sp = _resolve_week_index(league, week)
     rows = []
     for team in league.teams:
         roster = None
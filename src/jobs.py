@@ -0,0 +1,44 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Long-running work (e.g. backfills) started from the API and polled via /jobs/{id}
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+MAX_JOBS_KEPT = 200
+
+_pool = ThreadPoolExecutor(max_workers=JOB_WORKERS)
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+def submit(kind: str, fn, **params) -> dict:
+    job_id = uuid.uuid4().hex[:12]
+    job = {"id": job_id, "kind": kind, "params": params, "status": "queued", "submitted_at": time.time()}
+    with _jobs_lock:
+        _jobs[job_id] = job
+        # forget the oldest finished jobs
+        done = [j for j in _jobs.values() if j["status"] in ("done", "failed")]
+        for j in sorted(done, key=lambda j: j["submitted_at"])[: max(0, len(_jobs) - MAX_JOBS_KEPT)]:
+            _jobs.pop(j["id"], None)
+
+    def _run():
+        job["status"] = "running"
+        job["started_at"] = time.time()
+        try:
+            job["result"] = fn(**params)
+            job["status"] = "done"
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+            job["traceback"] = traceback.format_exc(limit=5)
+        job["finished_at"] = time.time()
+
+    _pool.submit(_run)
+    return dict(job)
+
+def get(job_id: str):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
@@ -0,0 +1,142 @@
+import os
+from pathlib import Path
+import pandas as pd
+
+# soccerdata 1.5.1 providers
+from soccerdata import FBref
+
+from .tenancy import fbref_scope, lock, shared_dir
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+CACHE_DIR = DATA_DIR / "cache"
+
+# Rolling windows (matches) and EWM half-life used for form metrics
+WINDOWS = (3, 5, 10)
+EWM_HALFLIFE = float(os.getenv("FORM_EWM_HALFLIFE", "3"))
+
+# One series per FBref player at a club: two namesakes at different clubs never
+# share a window. A mid-season transfer starts a new series; join_form() falls
+# back to the player's latest series when the caller's team label is stale.
+KEY = ["player", "team"]
+LOG_COLS = ["game_id", "date", "team", "player", "minutes", "xg", "xa", "shots"]
+
+# flattened soccerdata column -> our column (first match wins)
+_SOURCE_COLS = {
+    "minutes": ["min"],
+    "xg": ["expected_xg"],
+    "xa": ["expected_xag", "expected_xa"],
+    "shots": ["performance_sh", "standard_sh"],
+}
+
+_mem = {}
+
+def _store_path(competition: str, season: str) -> Path:
+    return shared_dir(competition, season) / "match_logs.parquet"
+
+def _flatten(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.reset_index()
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = ["_".join(str(p) for p in col if str(p)).lower() for col in df.columns]
+    else:
+        df.columns = [str(c).lower() for c in df.columns]
+    return df
+
+def _normalize(stats: pd.DataFrame, schedule: pd.DataFrame) -> pd.DataFrame:
+    df = _flatten(stats)
+    out = df[["game_id", "team", "player"]].copy()
+    for col, sources in _SOURCE_COLS.items():
+        src = next((s for s in sources if s in df.columns), None)
+        out[col] = pd.to_numeric(df[src], errors="coerce") if src else 0.0
+    out = out.merge(schedule[["game_id", "date"]].drop_duplicates("game_id"), on="game_id", how="left")
+    out[["minutes", "xg", "xa", "shots"]] = out[["minutes", "xg", "xa", "shots"]].fillna(0.0)
+    return out[LOG_COLS]
+
+def update(competition: str = None, season: str = None, max_matches: int = None):
+    """
+    Incrementally ingest per-player match stats into
+    data/shared/<competition>/<season>/match_logs.parquet: only matches with a
+    report that are not already stored are scraped.
+    """
+    competition, season = fbref_scope(competition, season)
+    path = _store_path(competition, season)
+    with lock("match_logs", competition, season):
+        fb = FBref(leagues=competition, seasons=season, data_dir=str(CACHE_DIR))
+        schedule = fb.read_schedule().reset_index()
+        schedule = schedule[schedule["game_id"].notna() & schedule["match_report"].notna()]
+
+        logs = pd.read_parquet(path) if path.exists() else pd.DataFrame(columns=LOG_COLS)
+        new_ids = sorted(set(schedule["game_id"]) - set(logs["game_id"]))
+        if max_matches:
+            new_ids = new_ids[:max_matches]
+        if not new_ids:
+            return {"ok": True, "new_matches": 0, "matches": int(logs["game_id"].nunique())}
+
+        stats = fb.read_player_match_stats(stat_type="summary", match_id=new_ids)
+        new = _normalize(stats, schedule)
+        logs = pd.concat([logs, new], ignore_index=True) if len(logs) else new
+        logs = logs.drop_duplicates(["game_id", "team", "player"], keep="last")
+        logs.to_parquet(path, index=False)
+        return {"ok": True, "new_matches": len(new_ids), "matches": int(logs["game_id"].nunique())}
+
+def form_frame(logs: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per-match rows with rolling form: for each window N in WINDOWS, per-90 xG,
+    xA and shots over the player's last N matches, plus exponentially weighted
+    per-90s. Computed with grouped rolling/ewm, no per-player Python loops.
+    """
+    df = logs.sort_values(KEY + ["date", "game_id"], kind="mergesort").reset_index(drop=True)
+    vals = ["minutes", "xg", "xa", "shots"]
+    g = df.groupby(KEY, sort=False)[vals]
+
+    for n in WINDOWS:
+        roll = g.rolling(n, min_periods=1).sum().reset_index(level=list(range(len(KEY))), drop=True)
+        mins = roll["minutes"].where(roll["minutes"] > 0)
+        df[f"min_l{n}"] = roll["minutes"]
+        for c in ("xg", "xa", "shots"):
+            df[f"{c}90_l{n}"] = (roll[c] / mins * 90).fillna(0.0)
+
+    ewm = g.ewm(halflife=EWM_HALFLIFE).mean().reset_index(level=list(range(len(KEY))), drop=True)
+    mins = ewm["minutes"].where(ewm["minutes"] > 0)
+    for c in ("xg", "xa", "shots"):
+        df[f"{c}90_ewm"] = (ewm[c] / mins * 90).fillna(0.0)
+    return df
+
+def join_form(df: pd.DataFrame, form: pd.DataFrame, player_col: str = "player", team_col: str = "team"):
+    """
+    Left-join latest_form() rows onto `df` by (player, team); rows whose team
+    has no series (e.g. a pre-transfer club label) take the player's most
+    recent series. Rows without any match logs get NaN form columns.
+    """
+    form = form.drop(columns=["team"]).assign(_team=form["team"])
+    cols = [c for c in form.columns if c not in ("player", "_team")]
+    latest = form.sort_values("last_match").drop_duplicates("player", keep="last")
+    by_name = df[[player_col]].merge(latest, left_on=player_col, right_on="player", how="left").set_index(df.index)
+    if team_col in df:
+        exact = df[[player_col, team_col]].merge(
+            form, left_on=[player_col, team_col], right_on=["player", "_team"], how="left"
+        ).set_index(df.index)
+    else:
+        exact = by_name.iloc[:, 0:0].assign(_team=None)
+    use_exact = exact["_team"].notna()
+    out = df.copy()
+    for c in cols:
+        out[c] = exact[c].where(use_exact, by_name[c])
+    out["form_team"] = exact["_team"].where(use_exact, by_name["_team"])
+    return out
+
+def latest_form(competition: str = None, season: str = None):
+    """Most recent form row per (player, team) (None until update() has run)."""
+    competition, season = fbref_scope(competition, season)
+    p = _store_path(competition, season)
+    if not p.exists():
+        return None
+    key = ("latest_form", competition, season)
+    mtime = p.stat().st_mtime
+    hit = _mem.get(key)
+    if hit and hit[0] == mtime:
+        return hit[1]
+    df = form_frame(pd.read_parquet(p))
+    form = df.groupby(KEY, sort=False).tail(1).drop(columns=["game_id", "minutes", "xg", "xa", "shots"])
+    form = form.rename(columns={"date": "last_match"}).reset_index(drop=True)
+    _mem[key] = (mtime, form)
+    return form
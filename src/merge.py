@@ -30,10 +30,19 @@ def build_or_update_idmap(fantrax_df: pd.DataFrame, fbref_df: pd.DataFrame, id_m
     id_map.to_csv(id_map_path, index=False)
     return id_map
 
+STAT_COLS = ["goals","assists","xg","xa","npxg","matches","minutes","team_name_fbref","pos_fbref"]
+
 def merge_fantrax_fbref(fantrax_df: pd.DataFrame, fbref_df: pd.DataFrame, id_map: pd.DataFrame) -> pd.DataFrame:
     merged = fantrax_df.merge(id_map[["player_id","fbref_id","fbref_player_name","confidence"]], on="player_id", how="left")
-    tmp = fantrax_df.merge(fbref_df, left_on="player_name", right_on="fbref_player_name", how="left", suffixes=("","_fb"))
-    for col in ["goals","assists","xg","xa","npxg","matches","minutes","team_name_fbref","pos_fbref"]:
-        if col in tmp:
-            merged[col] = merged[col].fillna(tmp[col])
+    fb = fbref_df.drop_duplicates("fbref_player_name")
+    stat_cols = [c for c in STAT_COLS if c in fb]
+    # primary: the fuzzy-matched FBref name stored in id_map (stable across re-scrapes,
+    # unlike fbref_df row labels); one row per name so rows stay aligned with fantrax_df
+    by_match = merged[["fbref_player_name"]].merge(fb, on="fbref_player_name", how="left").set_index(merged.index)
+    # fallback: exact name match
+    by_name = fantrax_df[["player_name"]].merge(
+        fb, left_on="player_name", right_on="fbref_player_name", how="left"
+    ).set_index(merged.index)
+    for col in stat_cols:
+        merged[col] = by_match[col].fillna(by_name[col])
     return merged
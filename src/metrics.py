@@ -1,5 +1,7 @@
 import pandas as pd
 WEIGHTS = {"goal": 6.0, "assist": 4.0}
+# Share of recent (last-5 / EWM) form vs season per-90 in proj_points_form
+FORM_WEIGHT = 0.5
 
 def per90(val, minutes):
     return (val / minutes) * 90 if minutes and minutes > 0 else 0.0
@@ -10,3 +12,23 @@ def add_basic_metrics(df: pd.DataFrame) -> pd.DataFrame:
     expected_minutes = df.get("minutes").fillna(0).clip(lower=0, upper=3000)
     df["proj_points_simple"] = ((df["xG90"] * WEIGHTS["goal"]) + (df["xA90"] * WEIGHTS["assist"])) * (expected_minutes / 90.0)
     return df
+
+def add_form_metrics(df: pd.DataFrame, form: pd.DataFrame, on: str = "fbref_player_name",
+                     team_on: str = "team_name_fbref") -> pd.DataFrame:
+    """
+    Join rolling form (see match_logs.latest_form) on player name + club and add
+    proj_points_form, which blends season per-90s with recent per-90s.
+    Call after add_basic_metrics; a no-op when no form is available.
+    """
+    from .match_logs import join_form  # soccerdata import only when form is used
+    if form is None or form.empty or on not in df:
+        return df
+    df = join_form(df, form, player_col=on, team_col=team_on)
+    # recent form = mean of last-5 and EWM per-90s; players without match logs keep season rates
+    recent_xg = (df["xg90_l5"] + df["xg90_ewm"]) / 2
+    recent_xa = (df["xa90_l5"] + df["xa90_ewm"]) / 2
+    xg90 = (1 - FORM_WEIGHT) * df["xG90"] + FORM_WEIGHT * recent_xg.fillna(df["xG90"])
+    xa90 = (1 - FORM_WEIGHT) * df["xA90"] + FORM_WEIGHT * recent_xa.fillna(df["xA90"])
+    expected_minutes = df.get("minutes").fillna(0).clip(lower=0, upper=3000)
+    df["proj_points_form"] = ((xg90 * WEIGHTS["goal"]) + (xa90 * WEIGHTS["assist"])) * (expected_minutes / 90.0)
+    return df
@@ -1,33 +1,136 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from pathlib import Path
-from .config import settings
-from .fantrax_client import fetch_league_objects, get_team_roster_slots
+from .fantrax_client import fetch_league_objects, get_team_roster_slots, scoring_period_numbers
 from .soccerdata_client import pull_fbref_player_stats
 from .merge import build_or_update_idmap, merge_fantrax_fbref
-from .metrics import add_basic_metrics
+from .metrics import add_basic_metrics, add_form_metrics
+from .match_logs import latest_form
+from . import artifacts, changes, tenancy
 
-DATA_DIR = Path(__file__).resolve().parents[1] / "data"
-ID_MAP_PATH = DATA_DIR / "id_map.csv"
+# Weeks whose rosters are fetched concurrently during a backfill
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "6"))
 
-def run(week: int):
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
+def run(week: int, league_id: str = None, season: str = None, competition: str = None):
+    """
+    Build the weekly analysis for one tenant (league_id + season). Runs for
+    different tenants may execute concurrently; runs for the same tenant are
+    serialized so id_map.csv and snapshots are not written twice at once.
+    """
+    report = _backfill([week], league_id=league_id, season=season, competition=competition, workers=1)
+    result = report["weeks"][0]
+    if result["status"] != "ok":
+        raise result["exc"]  # original type and traceback, e.g. "Week N out of range"
+    return result["artifact"]
 
-    league = fetch_league_objects()
-    roster_rows = get_team_roster_slots(league, week=week)
-    fantrax_df = pd.DataFrame(roster_rows)
-    fantrax_df.to_csv(DATA_DIR / f"cheekyfc_lineups_week{week}.csv", index=False)
+def backfill(weeks, league_id: str = None, season: str = None, competition: str = None,
+             workers: int = BACKFILL_WORKERS):
+    """
+    Run the pipeline for many weeks in one pass: the League object, the FBref
+    snapshot and id_map.csv are loaded once, rosters for all weeks are fetched
+    concurrently, then each week is merged and written in order (so change sets
+    chain week to week). A week that fails is reported with status "failed" and
+    its error; the other weeks are still written. Returns per-week timings.
+    """
+    report = _backfill(weeks, league_id=league_id, season=season, competition=competition, workers=workers)
+    for w in report["weeks"]:
+        w.pop("exc", None)  # JSON-safe for the CLI and /jobs
+    return report
 
-    fbref_df = pull_fbref_player_stats()
-    fbref_df.to_parquet(DATA_DIR / "cheekyfc_fbref_season_stats.parquet")
+def _backfill(weeks, league_id: str = None, season: str = None, competition: str = None,
+              workers: int = BACKFILL_WORKERS):
+    weeks = sorted(set(int(w) for w in weeks))
+    if not weeks:
+        raise ValueError("No weeks to run")
+    cfg = tenancy.resolve(league_id, season, competition)
+    out_dir = tenancy.tenant_dir(cfg)
+    t_start = time.perf_counter()
 
-    id_map = build_or_update_idmap(fantrax_df, fbref_df, str(ID_MAP_PATH))
+    with tenancy.lock("run", cfg.league_id, cfg.season):
+        out_dir.mkdir(parents=True, exist_ok=True)
 
+        t0 = time.perf_counter()
+        league = fetch_league_objects(cfg.league_id)
+        # warm the period cache once instead of racing to discover it per week;
+        # if discovery fails, each week falls back to league.scoring_periods()
+        try:
+            scoring_period_numbers(league, cfg.league_id, cfg.season)
+        except Exception:
+            pass
+        # shared across tenants on the same competition/season
+        fbref_df = pull_fbref_player_stats(cfg.competition, cfg.season)
+        # rolling form from match logs for this run's competition/season, if they
+        # have been ingested (no network); other seasons' logs are never mixed in
+        form = latest_form(*tenancy.form_scope(cfg))
+        setup_s = time.perf_counter() - t0
+
+        def fetch(week):
+            t = time.perf_counter()
+            try:
+                rows = get_team_roster_slots(league, week=week, league_id=cfg.league_id, season=cfg.season)
+                return pd.DataFrame(rows), time.perf_counter() - t, None
+            except Exception as e:
+                return None, time.perf_counter() - t, e
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(weeks)))) as pool:
+            fetched = dict(zip(weeks, pool.map(fetch, weeks)))
+
+        t0 = time.perf_counter()
+        ok_frames = [df for df, _, err in fetched.values() if err is None]
+        id_map = None
+        if ok_frames:
+            id_map = build_or_update_idmap(pd.concat(ok_frames, ignore_index=True), fbref_df, str(out_dir / "id_map.csv"))
+        id_map_s = time.perf_counter() - t0
+
+        per_week = []
+        for week in weeks:
+            fantrax_df, fetch_s, err = fetched[week]
+            if err is not None:
+                per_week.append({"week": week, "status": "failed", "stage": "fetch", "error": str(err),
+                                 "exc": err, "fetch_s": round(fetch_s, 3)})
+                continue
+            t0 = time.perf_counter()
+            try:
+                out_parquet = _write_week(out_dir, week, fantrax_df, fbref_df, id_map, form)
+            except Exception as e:
+                per_week.append({"week": week, "status": "failed", "stage": "build", "error": str(e), "exc": e,
+                                 "fetch_s": round(fetch_s, 3), "build_s": round(time.perf_counter() - t0, 3)})
+                continue
+            per_week.append({
+                "week": week,
+                "status": "ok",
+                "rows": int(len(fantrax_df)),
+                "fetch_s": round(fetch_s, 3),
+                "build_s": round(time.perf_counter() - t0, 3),
+                "artifact": str(out_parquet),
+            })
+
+    return {
+        "league_id": cfg.league_id,
+        "season": cfg.season,
+        "setup_s": round(setup_s, 3),
+        "id_map_s": round(id_map_s, 3),
+        "total_s": round(time.perf_counter() - t_start, 3),
+        "failed_weeks": [w["week"] for w in per_week if w["status"] != "ok"],
+        "weeks": per_week,
+    }
+
+def _write_week(out_dir, week, fantrax_df, fbref_df, id_map, form):
+    # build first: a week that fails here keeps its previous lineups, analysis
+    # and snapshot together instead of new lineups next to an old analysis
     merged = merge_fantrax_fbref(fantrax_df, fbref_df, id_map)
     merged = add_basic_metrics(merged)
+    merged = add_form_metrics(merged, form)
 
-    out_parquet = DATA_DIR / f"cheekyfc_player_analysis_week{week}.parquet"
-    out_csv = DATA_DIR / f"cheekyfc_player_analysis_week{week}.csv"
-    merged.to_parquet(out_parquet, index=False)
-    merged.to_csv(out_csv, index=False)
+    lineups_parquet = out_dir / f"cheekyfc_lineups_week{week}.parquet"
+    fantrax_df.to_parquet(lineups_parquet, index=False)
+    artifacts.invalidate(lineups_parquet)
 
-    return str(out_csv)
+    # Parquet is the single source of truth; CSV/JSONL/Arrow are encoded on
+    # demand by the API (see src/artifacts.py).
+    out_parquet = out_dir / f"cheekyfc_player_analysis_week{week}.parquet"
+    merged.to_parquet(out_parquet, index=False)
+    artifacts.invalidate(out_parquet)
+    changes.record(out_dir, week, merged)
+    return out_parquet
@@ -0,0 +1,62 @@
+import re
+import unicodedata
+import numpy as np
+from rapidfuzz import process, fuzz
+
+# Letters NFKD leaves alone (no combining-mark decomposition)
+_FOLD_EXTRA = str.maketrans({
+    "ø": "o", "đ": "d", "ð": "d", "ł": "l", "ı": "i", "þ": "th",
+    "æ": "ae", "œ": "oe", "ß": "ss",
+})
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+NGRAM = 3
+MAX_CANDIDATES = 200
+SCORE_CUTOFF = 70.0
+
+def fold(name) -> str:
+    """'Martin Ødegaard' -> 'martin odegaard' (accents, case and punctuation removed)."""
+    s = unicodedata.normalize("NFKD", str(name or "")).casefold().translate(_FOLD_EXTRA)
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", s).strip()
+
+def _grams(folded: str):
+    padded = f" {folded} "
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+def build(names) -> dict:
+    """
+    Build a name search index: folded names plus an n-gram -> row-ids
+    inverted index used to shortlist candidates before fuzzy scoring.
+    """
+    folded = [fold(n) for n in names]
+    postings = {}
+    for row, f in enumerate(folded):
+        for g in _grams(f):
+            postings.setdefault(g, []).append(row)
+    return {
+        "folded": folded,
+        "postings": {g: np.asarray(rows, dtype=np.int32) for g, rows in postings.items()},
+    }
+
+def query(index: dict, q: str, limit: int = MAX_CANDIDATES):
+    """
+    Return [(row, score)] for names matching `q`, best first. Scores are
+    rapidfuzz WRatio on folded names (0..100).
+    """
+    fq = fold(q)
+    folded = index["folded"]
+    if not fq or not folded:
+        return []
+
+    hits = [index["postings"][g] for g in _grams(fq) if g in index["postings"]]
+    if not hits:
+        return []
+    counts = np.bincount(np.concatenate(hits), minlength=len(folded))
+    nz = np.flatnonzero(counts)
+    if nz.size > limit:
+        nz = nz[np.argpartition(counts[nz], -limit)[-limit:]]
+
+    choices = {int(row): folded[row] for row in nz}
+    matches = process.extract(fq, choices, scorer=fuzz.WRatio, score_cutoff=SCORE_CUTOFF, limit=limit)
+    return [(row, float(score)) for _, score, row in matches]
@@ -1,13 +1,19 @@
+import os
+import time
 import soccerdata as sd
 import pandas as pd
 from .config import settings
+from .tenancy import lock, shared_dir
 
-def pull_fbref_player_stats() -> pd.DataFrame:
+# Shared FBref snapshots older than this are re-scraped
+FBREF_TTL_SECONDS = int(os.getenv("FBREF_TTL_SECONDS", str(6 * 3600)))
+
+def _scrape_fbref_player_stats(competition: str, season: str) -> pd.DataFrame:
     fbref = sd.FBref()
     df = fbref.read_player_season_stats(
         stat_type="summary",
-        competition=settings.competition,
-        season=settings.season
+        competition=competition,
+        season=season
     )
     df = df.reset_index().rename(columns={
         "player": "fbref_player_name",
@@ -25,3 +31,18 @@ def pull_fbref_player_stats() -> pd.DataFrame:
         if c in df:
             df[c] = df[c].astype(str)
     return df
+
+def pull_fbref_player_stats(competition: str = None, season: str = None, max_age: int = FBREF_TTL_SECONDS) -> pd.DataFrame:
+    """
+    FBref season table for (competition, season). Scraped once per `max_age`
+    and shared by every tenant on that competition/season.
+    """
+    competition = competition or settings.competition
+    season = season or settings.season
+    path = shared_dir(competition, season) / "fbref_season_stats.parquet"
+    with lock("fbref", competition, season):
+        if path.exists() and time.time() - path.stat().st_mtime < max_age:
+            return pd.read_parquet(path)
+        df = _scrape_fbref_player_stats(competition, season)
+        df.to_parquet(path)
+        return df
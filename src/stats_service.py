@@ -1,8 +1,10 @@
-import os
 from pathlib import Path
 import time
 import pandas as pd
 
+from . import match_logs, player_index
+from .tenancy import FBREF_LEAGUE, FBREF_SEASON, fbref_scope, lock, shared_dir
+
 # soccerdata 1.5.1 providers
 from soccerdata import FBref, ClubElo
 
@@ -10,35 +12,47 @@ DATA_DIR = Path(__file__).resolve().parents[1] / "data"
 CACHE_DIR = DATA_DIR / "cache"
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
-LEAGUE = os.getenv("COMPETITION", "ENG-Premier League")
-SEASON = os.getenv("SEASON", "2024-2025")  # adjust if needed
+LEAGUE = FBREF_LEAGUE
+SEASON = FBREF_SEASON
 
 # Basic in-process memo to avoid refetching during one request burst
 _mem = {}
 
-def _cache_write(df: pd.DataFrame, name: str):
-    p = CACHE_DIR / f"{name}.parquet"
+# Processed tables live in data/shared/<competition>/<season>/ so every tenant
+# on the same competition/season reads one snapshot; CACHE_DIR is soccerdata's
+# raw download cache.
+def _cache_path(name: str, competition: str, season: str) -> Path:
+    return shared_dir(*fbref_scope(competition, season)) / f"{name}.parquet"
+
+def _cache_write(df: pd.DataFrame, name: str, competition: str = None, season: str = None):
+    p = _cache_path(name, competition, season)
     df.to_parquet(p, index=False)
     return p
 
-def _cache_read(name: str):
-    p = CACHE_DIR / f"{name}.parquet"
+def _cache_read(name: str, competition: str = None, season: str = None):
+    p = _cache_path(name, competition, season)
     if p.exists():
         return pd.read_parquet(p)
     return None
 
-def refresh(force: bool = False):
+def refresh(force: bool = False, competition: str = None, season: str = None):
     """
-    Pull & cache public stats:
-      - FBref player standard + shooting + passing for current season
+    Pull & cache public stats for one competition/season (default: env):
+      - FBref player standard + shooting + passing
       - ClubElo ratings for team strength proxy
+    Concurrent callers for the same competition/season share one scrape.
     """
-    key = ("refresh_ts",)
+    competition, season = fbref_scope(competition, season)
+    with lock("stats", competition, season):
+        return _refresh(force, competition, season)
+
+def _refresh(force: bool, competition: str, season: str):
+    key = ("refresh_ts", competition, season)
     if not force and key in _mem and time.time() - _mem[key] < 300:
         return {"ok": True, "cached": True}
 
     # FBref
-    fb = FBref(leagues=LEAGUE, seasons=SEASON, data_dir=str(CACHE_DIR))
+    fb = FBref(leagues=competition, seasons=season, data_dir=str(CACHE_DIR))
     std = fb.read_player_season_stats(stat_type="standard")
     sht = fb.read_player_season_stats(stat_type="shooting")
     pas = fb.read_player_season_stats(stat_type="passing")
@@ -57,49 +71,96 @@ def refresh(force: bool = False):
     players.fillna(0, inplace=True)
 
     # ClubElo as simple team strength
-    ce = ClubElo(leagues=[LEAGUE], seasons=[SEASON], data_dir=str(CACHE_DIR))
+    ce = ClubElo(leagues=[competition], seasons=[season], data_dir=str(CACHE_DIR))
     elo = ce.read_team_history()
     # Take the latest Elo per team
     elo = elo.sort_values("date").groupby("team", as_index=False).tail(1)[["team","elo"]]
 
-    _cache_write(players, "players")
-    _cache_write(elo, "elo")
+    _cache_write(players, "players", competition, season)
+    _cache_write(elo, "elo", competition, season)
+    _build_index(players, competition, season)
 
     _mem[key] = time.time()
     return {"ok": True, "cached": False, "rows": int(len(players))}
 
-def ensure_data():
-    players = _cache_read("players")
-    elo = _cache_read("elo")
+def ensure_data(competition: str = None, season: str = None):
+    players = _cache_read("players", competition, season)
+    elo = _cache_read("elo", competition, season)
     if players is None or elo is None:
-        refresh(force=True)
-        players = _cache_read("players")
-        elo = _cache_read("elo")
+        # not forced: a concurrent caller may have just scraped this competition/season
+        refresh(competition=competition, season=season)
+        players = _cache_read("players", competition, season)
+        elo = _cache_read("elo", competition, season)
     return players, elo
 
-def search_players(q: str = "", team: str = "", position: str = "", limit: int = 50):
-    players, _ = ensure_data()
-    df = players.copy()
+def _build_index(players: pd.DataFrame, competition: str = None, season: str = None):
+    idx = player_index.build(players["player"].tolist())
+    # xg/xa percentile in [0, 1], blended with the name match score in search
+    idx["xgxa_pct"] = (players["xg"] + players["xa"]).rank(pct=True, method="average").fillna(0).to_numpy()
+    p = _cache_path("players", competition, season)
+    _mem[("player_index", *fbref_scope(competition, season))] = (p.stat().st_mtime if p.exists() else None, idx)
+    return idx
+
+def _get_index(players: pd.DataFrame, competition: str = None, season: str = None):
+    p = _cache_path("players", competition, season)
+    mtime = p.stat().st_mtime if p.exists() else None
+    hit = _mem.get(("player_index", *fbref_scope(competition, season)))
+    if hit and hit[0] == mtime and len(hit[1]["folded"]) == len(players):
+        return hit[1]
+    return _build_index(players, competition, season)
+
+def _with_form(df: pd.DataFrame, competition: str = None, season: str = None):
+    """Attach rolling form columns (last 3/5/10 matches, EWM) when match logs exist."""
+    form = match_logs.latest_form(competition, season)
+    if form is None:
+        return df
+    df = match_logs.join_form(df, form)
+    # players without match logs get null form, not 0 (NaN/NaT are not valid JSON)
+    cols = [c for c in form.columns if c not in ("player", "team")] + ["form_team"]
+    df[cols] = df[cols].astype(object).where(df[cols].notna(), None)
+    return df
+
+# Weight of the name match vs the xg/xa ranking when ordering search hits
+MATCH_WEIGHT = 0.8
+
+def search_players(q: str = "", team: str = "", position: str = "", limit: int = 50,
+                   competition: str = None, season: str = None, sort: str = ""):
+    """sort="form" orders by last-5-match xG+xA per 90 instead of season totals."""
+    players, _ = ensure_data(competition, season)
+    df = players
     if q:
-        ql = q.lower()
-        df = df[df["player"].str.lower().str.contains(ql, na=False)]
+        idx = _get_index(players, competition, season)
+        hits = player_index.query(idx, q)
+        if not hits:
+            return players.iloc[0:0].assign(match_score=pd.Series(dtype=float))
+        rows = [r for r, _ in hits]
+        df = players.iloc[rows].copy()
+        df["match_score"] = [s for _, s in hits]
+        df["_rank"] = MATCH_WEIGHT * df["match_score"] / 100.0 + (1 - MATCH_WEIGHT) * idx["xgxa_pct"][rows]
     if team:
         df = df[df["team"] == team]
     if position:
         df = df[df["position"].str.contains(position, na=False)]
-    df = df.sort_values(["xg","xa","shots_total","key_passes"], ascending=False)
+    df = _with_form(df, competition, season)
+    if sort == "form" and "xg90_l5" in df:
+        df = df.assign(_rank=pd.to_numeric(df["xg90_l5"]).fillna(0) + pd.to_numeric(df["xa90_l5"]).fillna(0))
+    if "_rank" in df:
+        df = df.sort_values(["_rank","xg","xa"], ascending=False).drop(columns="_rank")
+    else:
+        df = df.sort_values(["xg","xa","shots_total","key_passes"], ascending=False)
     return df.head(limit)
 
-def compare_players(names: list[str]):
-    players, _ = ensure_data()
+def compare_players(names: list[str], competition: str = None, season: str = None):
+    players, _ = ensure_data(competition, season)
     df = players[players["player"].isin(names)].copy()
-    df = df.sort_values("player")
+    df = _with_form(df, competition, season).sort_values("player")
     # keep a compact set of columns
-    cols = ["player","team","position","minutes","games_starts","games_subs","shots_total","shots_on_target","xg","xa","assists","key_passes"]
+    cols = ["player","team","position","minutes","games_starts","games_subs","shots_total","shots_on_target","xg","xa","assists","key_passes",
+            "last_match","xg90_l5","xa90_l5","shots90_l5","xg90_ewm","xa90_ewm"]
     return df[[c for c in cols if c in df.columns]]
 
-def matchup_table():
-    players, elo = ensure_data()
+def matchup_table(competition: str = None, season: str = None):
+    players, elo = ensure_data(competition, season)
     # crude “fixture difficulty”: team_elo - opponent_elo (we don’t have fixtures here;
     # so show team strength table now—frontend can combine with fixture list later)
     return elo.sort_values("elo", ascending=False)
@@ -0,0 +1,92 @@
+import os
+import re
+import threading
+from pathlib import Path
+from .config import Settings, settings
+
+# Layout:
+#   data/tenants/<league_id>/<season>/   per-league artifacts (weekly outputs, id_map, snapshots)
+#   data/shared/<competition>/<season>/  FBref/ClubElo snapshots reused by every tenant
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+TENANTS_DIR = DATA_DIR / "tenants"
+SHARED_DIR = DATA_DIR / "shared"
+
+# Settings.competition name -> soccerdata league id. soccerdata wants ids like
+# "ENG-Premier League"; this is the only place the two spellings are mapped, and
+# ids already in soccerdata form pass through unchanged.
+FBREF_LEAGUE_IDS = {
+    "Premier League": "ENG-Premier League",
+    "La Liga": "ESP-La Liga",
+    "Serie A": "ITA-Serie A",
+    "Bundesliga": "GER-Bundesliga",
+    "Ligue 1": "FRA-Ligue 1",
+}
+
+def fbref_league(competition: str) -> str:
+    return FBREF_LEAGUE_IDS.get(competition, competition)
+
+# Default soccerdata scope for the FBref/ClubElo stats (stats_service, match_logs);
+# resolve with fbref_scope() everywhere.
+FBREF_LEAGUE = fbref_league(os.getenv("COMPETITION", "ENG-Premier League"))
+FBREF_SEASON = os.getenv("SEASON", "2024-2025")
+
+# Pre-tenancy layout kept everything directly in data/; those files belong to the
+# default tenant (env LEAGUE_ID/SEASON) and are moved on first use.
+LEGACY_PATTERNS = ("id_map.csv", "cheekyfc_player_analysis_week*.parquet")
+
+_legacy_done = False
+_locks = {}
+_locks_guard = threading.Lock()
+
+def slug(value: str) -> str:
+    s = re.sub(r"[^0-9A-Za-z._-]+", "-", str(value or "").strip()).strip("-.")
+    return s or "default"
+
+def resolve(league_id: str = None, season: str = None, competition: str = None) -> Settings:
+    """Settings for one tenant: request/job parameters override the env defaults."""
+    update = {
+        k: v for k, v in
+        (("league_id", league_id), ("season", season), ("competition", competition))
+        if v
+    }
+    return settings.model_copy(update=update)
+
+def fbref_scope(competition: str = None, season: str = None):
+    """(competition, season) for soccerdata, falling back to the FBREF_* defaults."""
+    return fbref_league(competition) if competition else FBREF_LEAGUE, season or FBREF_SEASON
+
+def form_scope(cfg: Settings):
+    """soccerdata (competition, season) of a tenant's run: match logs are read for exactly this season."""
+    return fbref_league(cfg.competition), cfg.season
+
+def tenant_dir(cfg: Settings) -> Path:
+    d = TENANTS_DIR / slug(cfg.league_id) / slug(cfg.season)
+    if (cfg.league_id, cfg.season) == (settings.league_id, settings.season):
+        _migrate_legacy(d)
+    return d
+
+def _migrate_legacy(d: Path):
+    """Move pre-tenancy artifacts (id map, weekly Parquet) into the default tenant's dir once."""
+    global _legacy_done
+    if _legacy_done:
+        return
+    with lock("legacy-migration"):
+        if _legacy_done:
+            return
+        legacy = [p for pat in LEGACY_PATTERNS for p in DATA_DIR.glob(pat)]
+        if legacy:
+            d.mkdir(parents=True, exist_ok=True)
+            for p in legacy:
+                if not (d / p.name).exists():
+                    os.replace(p, d / p.name)
+        _legacy_done = True
+
+def shared_dir(competition: str, season: str) -> Path:
+    d = SHARED_DIR / slug(competition) / slug(season)
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+def lock(*key) -> threading.Lock:
+    """Process-wide lock per key, e.g. lock("run", league_id, season) or lock("fbref", comp, season)."""
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
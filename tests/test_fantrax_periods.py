@@ -0,0 +1,82 @@
+import json
+import pytest
+import requests
+
+from src import fantrax_client as fx
+from src import tenancy
+
+
+class _Team:
+    id = "t1"
+    name = "Team 1"
+
+
+class _League:
+    """Stub league with periods 1..n; `failures` maps period -> exceptions to raise first."""
+
+    def __init__(self, n=38, failures=None):
+        self.n = n
+        self.failures = {k: list(v) for k, v in (failures or {}).items()}
+        self.teams = [_Team()]
+        self.calls = 0
+
+    def team_roster(self, team_id, period_number=None, **kw):
+        self.calls += 1
+        pending = self.failures.get(period_number)
+        if pending:
+            raise pending.pop(0)
+        if not 1 <= period_number <= self.n:
+            raise ValueError(f"Invalid period {period_number}")
+        return object()
+
+    def scoring_periods(self):
+        return {i: type("SP", (), {"number": i})() for i in range(1, self.n + 1)}
+
+
+@pytest.fixture(autouse=True)
+def _isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(tenancy, "TENANTS_DIR", tmp_path / "tenants")
+    monkeypatch.setattr(fx, "PROBE_BACKOFF_SECONDS", 0)
+    fx._periods_mem.clear()
+
+
+def test_transient_probe_failure_is_retried():
+    league = _League(failures={13: [requests.Timeout("read timed out")]})
+    nums = fx.scoring_period_numbers(league, "stub", "2025-2026")
+    assert nums == list(range(1, 39))
+    assert fx.resolve_period_number(league, 13, "stub", "2025-2026") == 13
+
+
+def test_one_off_rejection_is_reprobed():
+    league = _League(failures={13: [ValueError("cookie hiccup")]})
+    assert fx.probe_valid_period_numbers(league) == list(range(1, 39))
+
+
+def test_gap_not_confirmed_by_league_is_not_cached():
+    league = _League(failures={13: [ValueError("nope")] * 5})
+    with pytest.raises(RuntimeError, match="gaps"):
+        fx.scoring_period_numbers(league, "stub", "2025-2026")
+    path = fx._periods_path("stub", "2025-2026")
+    assert not path.exists()
+    # roster resolution falls back to league.scoring_periods() instead of week 13 -> period 14
+    with pytest.raises(RuntimeError):
+        fx.resolve_period_number(league, 13, "stub", "2025-2026")
+
+
+def test_explicit_refresh_bypasses_grace():
+    league = _League(n=10)
+    fx.scoring_period_numbers(league, "stub", "2025-2026")
+    league.n = 12
+    assert len(fx.scoring_period_numbers(league, "stub", "2025-2026", refresh=True)) == 12
+    cached = json.loads(fx._periods_path("stub", "2025-2026").read_text())
+    assert cached["numbers"] == list(range(1, 13))
+
+
+def test_out_of_range_week_reprobes_once_within_grace():
+    league = _League(n=10)
+    fx.scoring_period_numbers(league, "stub", "2025-2026")
+    calls = league.calls
+    for week in range(11, 17):
+        with pytest.raises(ValueError, match="out of range"):
+            fx.resolve_period_number(league, week, "stub", "2025-2026")
+    assert league.calls == calls